@@ -0,0 +1,307 @@
+"""Calc-formula evaluation shared by the ``render_json`` and ``render_html`` pipelines.
+
+Both scripts put the repository root on ``sys.path`` and import from here, so
+dependency ordering, memoization and the evaluation backends live in one place.
+"""
+
+import ast
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from asteval import Interpreter
+
+
+@lru_cache(maxsize=None)
+def formula_dependencies(formula: str) -> Optional[Tuple[str, ...]]:
+    """Names read by ``formula``, or ``None`` when it does not parse."""
+    try:
+        # exec mode: asteval also accepts multi-statement formulas.
+        tree = ast.parse(formula)
+    except SyntaxError:
+        return None
+    return tuple(sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}))
+
+
+def topological_order(formulas: Dict[str, str]) -> Optional[List[str]]:
+    """Order calc field ids so every formula runs after the calc fields it reads.
+
+    Returns ``None`` when the formulas reference each other in a cycle or any
+    of them fails to parse (its dependencies are then unknown).
+    """
+    dependants: Dict[str, List[str]] = {field_id: [] for field_id in formulas}
+    pending: Dict[str, int] = {}
+    for field_id, formula in formulas.items():
+        names = formula_dependencies(formula)
+        if names is None:
+            return None
+        deps = formulas.keys() & set(names)
+        pending[field_id] = len(deps)
+        for dep in deps:
+            dependants[dep].append(field_id)
+
+    ready = deque(field_id for field_id, count in pending.items() if count == 0)
+    order: List[str] = []
+    while ready:
+        field_id = ready.popleft()
+        order.append(field_id)
+        for dependant in dependants[field_id]:
+            pending[dependant] -= 1
+            if pending[dependant] == 0:
+                ready.append(dependant)
+
+    return order if len(order) == len(formulas) else None
+
+
+@lru_cache(maxsize=None)
+def _pure_formula_names(formula: str) -> Optional[Tuple[str, ...]]:
+    """Names read by ``formula`` if it is a single expression without assignments.
+
+    ``None`` otherwise: statements and ``:=`` can set names that later formulas
+    read, and a memoized result would skip that side effect.
+    """
+    try:
+        tree = ast.parse(formula, mode="eval")
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.NamedExpr):
+            return None
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+    return tuple(sorted(names))
+
+
+def is_memoizable(formulas: Iterable[str]) -> bool:
+    """Whether results of ``formulas`` may come from the memo: all must be pure."""
+    return all(_pure_formula_names(formula) is not None for formula in formulas)
+
+
+# Results of pure formulas, keyed by backend, formula text and the typed values
+# of every name the formula reads. Shared across builds so batch runs over
+# similar inputs skip re-evaluation. Only immutable scalars are stored, so
+# builds never share a result object.
+_FORMULA_CACHE: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+_FORMULA_CACHE_SIZE = 4096
+_CACHEABLE_RESULTS = (int, float, str)
+
+
+def evaluate_memoized(
+    evaluator: "FormulaEvaluator", formula: str, code: Any, ctx: Dict[str, Any]
+) -> Any:
+    """Evaluate ``formula``, reusing an earlier result for the same inputs.
+
+    Callers must only use this when every formula of the run passes
+    ``is_memoizable``. A formula reading a name that is neither a field value
+    in ``ctx`` nor a safe builtin is evaluated uncached, because its result
+    depends on state the key cannot see.
+    """
+    names = _pure_formula_names(formula)
+    if names is None or not all(name in ctx or name in SAFE_BUILTINS for name in names):
+        return evaluator.evaluate(code)
+    values = tuple(ctx.get(name, SAFE_BUILTINS.get(name)) for name in names)
+    key = (type(evaluator), formula, values, tuple(type(value) for value in values))
+    try:
+        cached = _FORMULA_CACHE[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable input (e.g. a JSON list override): evaluate uncached.
+        return evaluator.evaluate(code)
+    else:
+        _FORMULA_CACHE.move_to_end(key)
+        return cached
+
+    result = evaluator.evaluate(code)
+    if isinstance(result, _CACHEABLE_RESULTS):
+        _FORMULA_CACHE[key] = result
+        if len(_FORMULA_CACHE) > _FORMULA_CACHE_SIZE:
+            _FORMULA_CACHE.popitem(last=False)
+    return result
+
+
+# One asteval interpreter per process: building it (symtable, node handlers,
+# math imports) dominates small renders. Hold ENGINE_LOCK while using it.
+_SHARED_ENGINE: Optional[Interpreter] = None
+_BASE_SYMTABLE: Dict[str, Any] = {}
+ENGINE_LOCK = threading.Lock()
+
+
+def _shared_engine() -> Interpreter:
+    """Return the shared interpreter reset to its built-in symbols and no errors."""
+    global _SHARED_ENGINE
+    if _SHARED_ENGINE is None:
+        _SHARED_ENGINE = Interpreter()
+        _BASE_SYMTABLE.update(_SHARED_ENGINE.symtable)
+    else:
+        _SHARED_ENGINE.symtable.clear()
+        _SHARED_ENGINE.symtable.update(_BASE_SYMTABLE)
+        # Drop error/source state left by the previous render.
+        _SHARED_ENGINE.error = []
+        _SHARED_ENGINE.error_msg = None
+        _SHARED_ENGINE.expr = None
+        _SHARED_ENGINE.code_text = []
+    return _SHARED_ENGINE
+
+
+def report_formula_error(exc: Exception) -> None:
+    print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+
+
+# ── Formula evaluation backends ─────────────────────────────────────────
+class FormulaEvaluator(Protocol):
+    """Compiles calc formulas once and evaluates them against bound field values."""
+
+    def compile(self, field_id: str, formula: str) -> Any: ...
+
+    def bind(self, values: Dict[str, Any]) -> None: ...
+
+    def evaluate(self, code: Any) -> Any: ...
+
+
+class AstevalBackend:
+    """Sandboxed asteval interpreter; the default, safe for untrusted formulas."""
+
+    def __init__(self) -> None:
+        self.engine = _shared_engine()
+
+    def compile(self, field_id: str, formula: str) -> Any:
+        try:
+            return self.engine.parse(formula), formula
+        except Exception:
+            # engine.eval re-parses the source and reports the error as before.
+            return None, formula
+
+    def bind(self, values: Dict[str, Any]) -> None:
+        self.engine.symtable.update(values)
+
+    def evaluate(self, code: Any) -> Any:
+        node, formula = code
+        if node is None:
+            return self.engine.eval(formula)
+        # Same as engine.eval(formula) minus the parse; asteval's error records
+        # need the source text as ``expr``, not the parsed Module.
+        engine = self.engine
+        engine.lineno = 0
+        engine.error = []
+        engine.error_msg = None
+        engine.start_time = time.time()
+        try:
+            return engine.run(node, expr=formula, lineno=0, with_raise=False)
+        except Exception:
+            errmsg = engine.error[-1].get_error()[1] if engine.error else sys.exc_info()[1]
+            print(errmsg, file=engine.err_writer)
+            return None
+
+
+SAFE_BUILTINS = {"min": min, "max": max, "abs": abs, "round": round, "pow": pow}
+
+
+class PythonEvalBackend:
+    """Native ``eval`` of pre-compiled code objects.
+
+    Much faster than asteval but not sandboxed: only enable it for trusted,
+    developer-authored configs.
+    """
+
+    def __init__(self) -> None:
+        self.namespace: Dict[str, Any] = {}
+        self._globals = {"__builtins__": SAFE_BUILTINS}
+
+    def compile(self, field_id: str, formula: str) -> Any:
+        try:
+            return compile(formula, f"<{field_id}>", "eval")
+        except (SyntaxError, ValueError) as exc:
+            # Reported once here; evaluate() then leaves the field empty.
+            report_formula_error(exc)
+            return None
+
+    def bind(self, values: Dict[str, Any]) -> None:
+        self.namespace.update(values)
+
+    def evaluate(self, code: Any) -> Any:
+        if code is None:
+            return None
+        try:
+            return eval(code, self._globals, self.namespace)
+        except Exception as exc:
+            # Mirror asteval: report the failure and leave the field empty.
+            report_formula_error(exc)
+            return None
+
+
+EVAL_BACKENDS: Dict[str, Callable[[], FormulaEvaluator]] = {
+    "asteval": AstevalBackend,
+    "lambda": PythonEvalBackend,
+}
+
+
+def make_evaluator(name: Optional[str]) -> FormulaEvaluator:
+    try:
+        return EVAL_BACKENDS[name or "asteval"]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown eval_backend {name!r} (expected one of {sorted(EVAL_BACKENDS)})"
+        ) from None
+
+
+def evaluate_formulas(
+    fields: Iterable[Dict[str, Any]],
+    ctx: Dict[str, Any],
+    *,
+    backend: Optional[str] = None,
+    compiled: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Evaluate every calc field of ``fields`` into ``ctx`` (updated in place).
+
+    ``compiled`` maps formula source to its compiled form; pass the same dict
+    across builds of one config to compile each formula once.
+    """
+    fields = list(fields)
+    formulas = {
+        field["id"]: field["formula"]
+        for field in fields
+        if field.get("source") == "calc" and "formula" in field
+    }
+    if not formulas:
+        return ctx
+    if compiled is None:
+        compiled = {}
+
+    with ENGINE_LOCK:
+        evaluator = make_evaluator(backend)
+        for field in fields:
+            if field.get("source") == "calc" and "formula" in field and field["formula"] not in compiled:
+                compiled[field["formula"]] = evaluator.compile(field["id"], field["formula"])
+        evaluator.bind(ctx)
+
+        order = topological_order(formulas)
+        if order is not None:
+            memoize = is_memoizable(formulas.values())
+            for field_id in order:
+                code = compiled[formulas[field_id]]
+                if memoize:
+                    value = evaluate_memoized(evaluator, formulas[field_id], code, ctx)
+                else:
+                    value = evaluator.evaluate(code)
+                ctx[field_id] = value
+                evaluator.bind({field_id: value})
+            return ctx
+
+        # Circular or unparseable formulas: iterate until the values settle (bounded).
+        for _ in range(8):
+            changed = False
+            evaluator.bind(ctx)
+            for field in fields:
+                if field.get("source") == "calc" and "formula" in field:
+                    value = evaluator.evaluate(compiled[field["formula"]])
+                    if ctx.get(field["id"]) != value:
+                        ctx[field["id"]] = value
+                        changed = True
+            if not changed:
+                break
+    return ctx
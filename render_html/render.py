@@ -1,14 +1,166 @@
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
+import ast
+import hashlib
 import json
-from typing import Any, Dict, Iterable, List, Optional
-
-from asteval import Interpreter
-from jinja2 import Environment, FileSystemLoader
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from jinja2 import BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader
+
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is fine
+    orjson = None
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON config bytes, with orjson when installed.
+
+    Input orjson rejects but ``json`` accepts (``NaN``, ``Infinity``, huge
+    exponents) is re-parsed with the stdlib. One difference remains: orjson
+    reads integers outside the 64-bit range as floats, so configs needing exact
+    values that large should be parsed without orjson installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+# formula_engine.py sits at the repository root, shared with render_json.
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent)
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+from formula_engine import (  # noqa: E402
+    SAFE_BUILTINS,
+    evaluate_formulas,
+    report_formula_error,
+    topological_order,
+)
 
 DEFAULT_TITLE = "Bảng so sánh phương án tái tài trợ"
 
 
+def _intern_field_strings(field: Dict[str, Any]) -> Dict[str, Any]:
+    # Ids and low-cardinality attributes repeat across every scenario built
+    # from the same globals; interning lets them share one string object.
+    field["id"] = sys.intern(field["id"])
+    for key in ("unit", "source", "type"):
+        if isinstance(field.get(key), str):
+            field[key] = sys.intern(field[key])
+    label = field.get("label")
+    if isinstance(label, str) and len(label) < 64:
+        field["label"] = sys.intern(label)
+    return field
+
+
+# ── Specialised compute for trusted ("lambda") scenarios ────────────────
+class _RenameFields(ast.NodeTransformer):
+    def __init__(self, local_names: Dict[str, str]) -> None:
+        self.local_names = local_names
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.local_names:
+            return ast.copy_location(ast.Name(id=self.local_names[node.id], ctx=node.ctx), node)
+        return node
+
+
+_Specialized = Optional[Tuple[Callable[[Dict[str, Any]], Dict[str, Any]], Set[str]]]
+
+# Generated functions keyed by field schema hash, least recently used first.
+_SPECIALIZED: "OrderedDict[str, _Specialized]" = OrderedDict()
+_SPECIALIZED_SIZE = 64
+
+
+def _schema_key(fields: List[Dict[str, Any]]) -> str:
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode("utf8")).hexdigest()
+
+
+def _remember_specialized(key: str, result: _Specialized) -> _Specialized:
+    _SPECIALIZED[key] = result
+    if len(_SPECIALIZED) > _SPECIALIZED_SIZE:
+        _SPECIALIZED.popitem(last=False)
+    return result
+
+
+def _specialize_compute(fields: List[Dict[str, Any]], key: str) -> _Specialized:
+    """Generate a straight-line replacement for ``_compute_values`` on this field schema.
+
+    The generated function fills user defaults and evaluates every formula once, in
+    dependency order, with field values held in local variables. Returns the function
+    plus the builtin names an input must not shadow, or ``None`` when the schema has
+    cycles, formulas that are not single expressions, or formulas reading names the
+    native backend could not resolve. ``key`` is the schema's ``_schema_key``; results
+    are cached under it so scenarios sharing globals reuse the same function.
+    """
+    try:
+        _SPECIALIZED.move_to_end(key)
+        return _SPECIALIZED[key]
+    except KeyError:
+        pass
+
+    user_ids = [field["id"] for field in fields if field.get("source") == "user"]
+    formulas = {
+        field["id"]: field["formula"]
+        for field in fields
+        if field.get("source") == "calc" and "formula" in field
+    }
+    try:
+        trees = {field_id: ast.parse(formula, mode="eval") for field_id, formula in formulas.items()}
+    except SyntaxError:
+        # Leave bad formulas to the generic path, which reports them.
+        return _remember_specialized(key, None)
+
+    order = topological_order(formulas)
+    known = set(user_ids) | formulas.keys()
+    referenced = {
+        node.id for tree in trees.values() for node in ast.walk(tree) if isinstance(node, ast.Name)
+    }
+    if order is None or not referenced <= known | SAFE_BUILTINS.keys():
+        return _remember_specialized(key, None)
+
+    local_names = {field_id: f"_v{index}" for index, field_id in enumerate(sorted(known))}
+    defaults: Dict[str, Any] = {}
+    lines = ["def _specialized(inputs):", "    ctx = _dict(inputs)"]
+    for field in fields:
+        field_id = field["id"]
+        if field.get("source") == "user" and field_id not in defaults:
+            defaults[field_id] = field.get("default")
+            lines.append(f"    if {field_id!r} not in ctx:")
+            lines.append(f"        ctx[{field_id!r}] = _defaults[{field_id!r}]")
+    for field_id in dict.fromkeys(user_ids):
+        lines.append(f"    {local_names[field_id]} = ctx[{field_id!r}]")
+    for field_id in order:
+        tree = _RenameFields(local_names).visit(trees[field_id])
+        target = local_names[field_id]
+        lines += [
+            "    try:",
+            f"        {target} = {ast.unparse(tree.body)}",
+            "    except _Exception as exc:",
+            "        _report(exc)",
+            f"        {target} = None",
+            f"    ctx[{field_id!r}] = {target}",
+        ]
+    lines.append("    return ctx")
+
+    namespace: Dict[str, Any] = {
+        "__builtins__": SAFE_BUILTINS,
+        "_dict": dict,
+        "_defaults": defaults,
+        "_report": report_formula_error,
+        "_Exception": Exception,
+    }
+    exec(compile("\n".join(lines), f"<specialized {key[:8]}>", "exec"), namespace)
+    result = (namespace["_specialized"], referenced & SAFE_BUILTINS.keys())
+    return _remember_specialized(key, result)
+
+
 # ────────────────────────────────────────────────
 # Scenario builder core
 class ScenarioBuilder:
@@ -30,13 +182,14 @@ class ScenarioBuilder:
         self._globals_cfg: Optional[Dict[str, Any]] = None
         self._scenario_cfg: Optional[Dict[str, Any]] = None
         self._fields: Optional[List[Dict[str, Any]]] = None
+        self._schema_key: Optional[str] = None  # hash of the merged fields, for _specialize_compute
         self._values: Optional[Dict[str, Any]] = None
+        self._compiled_formulas: Dict[str, Any] = {}  # formula source -> compiled form
 
     # Loading helpers -----------------------------------------------------
     @staticmethod
     def _load_json(path: Path) -> Dict[str, Any]:
-        with open(path, "r", encoding="utf8") as handle:
-            return json.load(handle)
+        return _loads(path.read_bytes())
 
     # Merge globals + scenario with overrides -----------------------------
     @staticmethod
@@ -51,46 +204,44 @@ class ScenarioBuilder:
                 if key in overrides:
                     base[key] = overrides[key]
             base["source"] = "user"
-            merged.append(base)
+            merged.append(_intern_field_strings(base))
 
         merged.extend(scenario_cfg.get("fields", []))
         return merged
 
     # Evaluate formulas ---------------------------------------------------
-    @staticmethod
-    def _compute_values(fields: Iterable[Dict[str, Any]], inputs: Dict[str, Any]) -> Dict[str, Any]:
+    def _compute_values(self, fields: Iterable[Dict[str, Any]], inputs: Dict[str, Any]) -> Dict[str, Any]:
+        backend = (self._scenario_cfg or {}).get("eval_backend")
+        if backend == "lambda":
+            fields = list(fields)
+            if self._schema_key is None:
+                self._schema_key = _schema_key(fields)
+            specialized = _specialize_compute(fields, self._schema_key)
+            if specialized is not None and specialized[1].isdisjoint(inputs):
+                return specialized[0](inputs)
+
         ctx: Dict[str, Any] = dict(inputs)
 
         for field in fields:
             if field.get("source") == "user" and field["id"] not in ctx:
                 ctx[field["id"]] = field.get("default")
 
-        engine = Interpreter()
-        for _ in range(8):
-            changed = False
-            engine.symtable.update(ctx)
-            for field in fields:
-                if field.get("source") == "calc" and "formula" in field:
-                    value = engine(field["formula"])
-                    if ctx.get(field["id"]) != value:
-                        ctx[field["id"]] = value
-                        changed = True
-            if not changed:
-                break
-
-        return ctx
+        return evaluate_formulas(fields, ctx, backend=backend, compiled=self._compiled_formulas)
 
     # Field presentation helpers -----------------------------------------
     @staticmethod
-    def _resolve_label(field: Dict[str, Any], globals_cfg: Dict[str, Any], scenario_cfg: Dict[str, Any]) -> str:
+    def _resolve_label(
+        field: Dict[str, Any],
+        globals_fields_map: Dict[str, Dict[str, Any]],
+        field_labels: Dict[str, str],
+    ) -> str:
         if field.get("label"):
             return field["label"]
-        labels = scenario_cfg.get("field_labels", {})
-        if field["id"] in labels:
-            return labels[field["id"]]
-        gmap = {f["id"]: f for f in globals_cfg.get("fields", [])}
-        if field["id"] in gmap and gmap[field["id"]].get("label"):
-            return gmap[field["id"]]["label"]
+        if field["id"] in field_labels:
+            return field_labels[field["id"]]
+        global_field = globals_fields_map.get(field["id"])
+        if global_field is not None and global_field.get("label"):
+            return global_field["label"]
         return field["id"].replace("_", " ").title()
 
     def _resolve_unit(self, field: Dict[str, Any]) -> Optional[str]:
@@ -113,31 +264,30 @@ class ScenarioBuilder:
         self._fields = fields
         self._values = values
 
-        prepared_fields: List[FieldOutput] = []
-        for field in fields:
+        globals_fields_map = {field["id"]: field for field in globals_cfg.get("fields", [])}
+        field_labels = scenario_cfg.get("field_labels", {})
+
+        def prepare(field: Dict[str, Any]) -> FieldOutput:
             unit = self._resolve_unit(field)
-            label = self._resolve_label(field, globals_cfg, scenario_cfg)
-            prepared_fields.append(
-                FieldOutput(
-                    id=field["id"],
-                    label=label,
-                    type=field.get("type"),
-                    unit=unit,
-                    source=field.get("source"),
-                    value=self._normalise_value(field, values.get(field["id"]), unit),
-                )
+            return FieldOutput(
+                id=field["id"],
+                label=self._resolve_label(field, globals_fields_map, field_labels),
+                type=field.get("type"),
+                unit=unit,
+                source=field.get("source"),
+                value=self._normalise_value(field, values.get(field["id"]), unit),
             )
 
         return ScenarioData(
             scenario_id=scenario_cfg.get("scenario_id"),
             title=scenario_cfg.get("title", DEFAULT_TITLE),
             choices=list(scenario_cfg.get("choices", [])),
-            fields=prepared_fields,
+            fields=LazyFieldView(fields, prepare),
             values=values,
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldOutput:
     id: str
     label: Optional[str]
@@ -157,12 +307,70 @@ class FieldOutput:
         }
 
 
-@dataclass
+class LazyFieldView:
+    """Sequence of prepared fields that builds each ``FieldOutput`` on first access.
+
+    Index by position, slice, or field id; iterate or call ``materialize`` when
+    every field is needed. Equality and ``repr`` build every field, so views
+    compare like lists of ``FieldOutput``. ``dataclasses.asdict`` copies the
+    view as-is rather than a list of dicts; use ``ScenarioData.to_dict``.
+    """
+
+    __slots__ = ("_fields", "_prepare", "_positions", "_prepared")
+
+    def __init__(
+        self,
+        fields: List[Dict[str, Any]],
+        prepare: Callable[[Dict[str, Any]], FieldOutput],
+    ) -> None:
+        self._fields = fields
+        self._prepare = prepare
+        self._positions = {field["id"]: index for index, field in enumerate(fields)}
+        self._prepared: List[Optional[FieldOutput]] = [None] * len(fields)
+
+    def _at(self, index: int) -> FieldOutput:
+        prepared = self._prepared[index]
+        if prepared is None:
+            prepared = self._prepare(self._fields[index])
+            self._prepared[index] = prepared
+        return prepared
+
+    def __getitem__(self, key: int | str | slice) -> FieldOutput | List[FieldOutput]:
+        if isinstance(key, str):
+            return self._at(self._positions[key])
+        if isinstance(key, slice):
+            return [self._at(index) for index in range(len(self._fields))[key]]
+        return self._at(range(len(self._fields))[key])
+
+    def __contains__(self, field_id: object) -> bool:
+        return field_id in self._positions
+
+    def __iter__(self) -> Iterator[FieldOutput]:
+        return (self._at(index) for index in range(len(self._fields)))
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyFieldView):
+            return self.materialize() == other.materialize()
+        if isinstance(other, list):
+            return self.materialize() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyFieldView({self.materialize()!r})"
+
+    def materialize(self) -> List[FieldOutput]:
+        return list(self)
+
+
+@dataclass(slots=True)
 class ScenarioData:
     scenario_id: Optional[str]
     title: str
     choices: List[Dict[str, Any]]
-    fields: List[FieldOutput]
+    fields: LazyFieldView
     values: Dict[str, Any]
 
     def to_dict(self) -> Dict[str, Any]:
@@ -170,7 +378,7 @@ class ScenarioData:
             "scenario_id": self.scenario_id,
             "title": self.title,
             "choices": self.choices,
-            "fields": [field.to_dict() for field in self.fields],
+            "fields": [field.to_dict() for field in self.fields.materialize()],
             "values": self.values,
         }
 
@@ -188,10 +396,39 @@ def prepare_scenario_data(
 
 # ────────────────────────────────────────────────
 # 4. render HTML (optional: can be skipped by downstream consumers)
+_ENV_CACHE: Dict[Path, Environment] = {}
+
+
+def _get_bytecode_cache() -> Optional[BytecodeCache]:
+    # JINJA_BCC_DIR="" disables the on-disk cache (handy while editing templates).
+    directory = os.environ.get("JINJA_BCC_DIR")
+    if directory is None:
+        # Jinja's default: a private per-user temp directory (0700, ownership checked).
+        return FileSystemBytecodeCache(pattern="%s.cache")
+    if not directory:
+        return None
+    Path(directory).mkdir(mode=0o700, parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(directory=directory, pattern="%s.cache")
+
+
+def _get_env(templates_path: str | Path) -> Environment:
+    path = Path(templates_path).resolve()
+    env = _ENV_CACHE.get(path)
+    if env is None:
+        env = Environment(
+            loader=FileSystemLoader(str(path)),
+            auto_reload=False,
+            cache_size=-1,
+            bytecode_cache=_get_bytecode_cache(),
+        )
+        env.filters["money"] = lambda v: f"{v:,.0f}".replace(",", ".")
+        env.filters["number"] = lambda v: f"{v:.2f}" if isinstance(v, (float, int)) else v
+        _ENV_CACHE[path] = env
+    return env
+
+
 def render_html(prepared: ScenarioData, templates_path: str | Path) -> str:
-    env = Environment(loader=FileSystemLoader(templates_path))
-    env.filters["money"] = lambda v: f"{v:,.0f}".replace(",", ".")
-    env.filters["number"] = lambda v: f"{v:.2f}" if isinstance(v, (float, int)) else v
+    env = _get_env(templates_path)
 
     rendered_blocks: List[str] = []
     for choice in prepared.choices:
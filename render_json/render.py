@@ -1,14 +1,115 @@
 import argparse
+import copy
 import json
+import os
+import sys
+from collections import OrderedDict
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple, TypeVar
 from decimal import Decimal, InvalidOperation
 
-from asteval import Interpreter
+try:
+    import orjson
+except ImportError:  # optional speedup; stdlib json is fine
+    orjson = None
+
+
+def _loads(data: bytes) -> Any:
+    """Parse JSON config bytes, with orjson when installed.
+
+    Input orjson rejects but ``json`` accepts (``NaN``, ``Infinity``, huge
+    exponents) is re-parsed with the stdlib. One difference remains: orjson
+    reads integers outside the 64-bit range as floats, so configs needing exact
+    values that large should be parsed without orjson installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
 
 
 BASE_DIR = Path(__file__).resolve().parent
 
+# formula_engine.py sits at the repository root, shared with render_html.
+if str(BASE_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR.parent))
+
+from formula_engine import evaluate_formulas  # noqa: E402
+
+# Parsed configs shared across renderer instances, keyed by (path, mtime) so
+# edits on disk are picked up. Never hand cached objects to callers: payloads
+# take config values through _detached.
+_CONFIG_CACHE: "OrderedDict[Tuple[Path, int], Dict[str, Any]]" = OrderedDict()
+_CONFIG_CACHE_SIZE = 64
+
+
+def _detached(value: Any) -> Any:
+    """Copy JSON containers taken from a cached config; scalars are returned as-is."""
+    return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+class _SafeStr(str):
+    """Formatted number (digits, separators, ``%``) that needs no HTML escaping."""
+
+
+_ONE = Decimal("1")
+_CENT = Decimal("0.01")
+_MONEY_INT = "{:,.0f}".format
+_MONEY_DEC = "{:,.2f}".format
+_VN_SEPARATORS = str.maketrans({",": ".", ".": ","})
+_PCT = "{:.2f}%".format
+_PCT_YR = "{:.2f}%/năm".format
+
+
+def _fmt_money(value: Any) -> Any:
+    try:
+        num = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return value
+
+    integral = num == num.to_integral()
+    try:
+        num = num.quantize(_ONE if integral else _CENT)
+    except InvalidOperation:
+        num = num.quantize(_CENT)
+
+    formatted = _MONEY_INT(num) if integral else _MONEY_DEC(num)
+    return _SafeStr(formatted.translate(_VN_SEPARATORS))
+
+
+def _fmt_percent(value: Any) -> Any:
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return value
+    return _SafeStr(_PCT(num))
+
+
+def _fmt_percent_per_year(value: Any) -> Any:
+    try:
+        num = float(value)
+    except (TypeError, ValueError):
+        return value
+    return _SafeStr(_PCT_YR(num))
+
+
+def _fmt_integer(value: Any) -> Any:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+_FORMATTERS: Dict[str, Callable[[Any], Any]] = {
+    "money": _fmt_money,
+    "percent": _fmt_percent,
+    "percent_per_year": _fmt_percent_per_year,
+    "integer": _fmt_integer,
+}
+
 
 class TemplateRenderer:
     """Render structured payloads from template configuration files."""
@@ -26,6 +127,7 @@ class TemplateRenderer:
         self._config: Optional[Dict[str, Any]] = None
         self._values: Optional[Dict[str, Any]] = None
         self._field_meta: Dict[str, Dict[str, Any]] = {}
+        self._compiled_formulas: Dict[str, Any] = {}  # formula source -> compiled form
 
     # ── Core orchestration ──────────────────────────────────────────────
     def build_payload(self) -> Dict[str, Any]:
@@ -33,27 +135,50 @@ class TemplateRenderer:
         values = self._compute_values(config.get("fields", []))
         layout = config.get("layout", {})
         return {
-            "title": config.get("title"),
-            "currency": config.get("currency"),
+            "title": _detached(config.get("title")),
+            "currency": _detached(config.get("currency")),
             "data": self._build_field_data(config, values),
             "tables": self._build_tables(layout, values),
-            "notes": layout.get("notes") or config.get("notes", []),
+            "notes": _detached(layout.get("notes") or config.get("notes", [])),
         }
 
-    def write_payload(self, destination: Path) -> Path:
+    def write_payload(self, destination: Path, *, fast: bool = False) -> Path:
+        """Write the payload as indented JSON.
+
+        The stdlib encoder is the reference format (committed ``*_payload.json``
+        files are diffed against it). ``fast=True`` uses orjson when installed;
+        its float spelling differs (``0.00001`` vs ``1e-05``, NaN/inf become
+        ``null``), and payloads orjson cannot encode fall back to the stdlib.
+        """
         payload = self.build_payload()
-        destination.write_text(
-            json.dumps(payload, ensure_ascii=False, indent=2),
-            encoding="utf8",
-        )
+        if fast and orjson is not None:
+            try:
+                destination.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+                return destination
+            except orjson.JSONEncodeError:
+                pass
+        with open(destination, "w", encoding="utf8") as handle:
+            json.dump(payload, handle, ensure_ascii=False, indent=2)
         return destination
 
     # ── Helpers ────────────────────────────────────────────────────────
     def _load_config(self) -> Dict[str, Any]:
-        if self._config is None:
-            with open(self.config_path, "r", encoding="utf8") as handle:
-                self._config = json.load(handle)
-        return self._config
+        if self._config is not None:
+            return self._config
+
+        path = self.config_path.resolve()
+        key = (path, path.stat().st_mtime_ns)
+        config = _CONFIG_CACHE.get(key)
+        if config is None:
+            config = _loads(path.read_bytes())
+            _CONFIG_CACHE[key] = config
+            if len(_CONFIG_CACHE) > _CONFIG_CACHE_SIZE:
+                _CONFIG_CACHE.popitem(last=False)
+        else:
+            _CONFIG_CACHE.move_to_end(key)
+
+        self._config = config
+        return config
 
     def _compute_values(self, fields: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         if self._values is not None:
@@ -64,20 +189,14 @@ class TemplateRenderer:
 
         for field in fields:
             if field.get("source", "user") == "user" and field["id"] not in ctx:
-                ctx[field["id"]] = field.get("default")
-
-        engine = Interpreter()
-        for _ in range(8):
-            changed = False
-            engine.symtable.update(ctx)
-            for field in fields:
-                if field.get("source") == "calc" and "formula" in field:
-                    result = engine(field["formula"])
-                    if ctx.get(field["id"]) != result:
-                        ctx[field["id"]] = result
-                        changed = True
-            if not changed:
-                break
+                ctx[field["id"]] = _detached(field.get("default"))
+
+        evaluate_formulas(
+            fields,
+            ctx,
+            backend=self._load_config().get("eval_backend"),
+            compiled=self._compiled_formulas,
+        )
 
         self._values = ctx
         return ctx
@@ -86,49 +205,8 @@ class TemplateRenderer:
     def _format_value(value: Any, fmt: Optional[str]) -> Any:
         if value is None or fmt is None:
             return value
-
-        if fmt == "money":
-            try:
-                num = Decimal(str(value))
-            except (InvalidOperation, TypeError, ValueError):
-                return value
-
-            integral = num == num.to_integral()
-            quant = Decimal("1") if integral else Decimal("0.01")
-            try:
-                num = num.quantize(quant)
-            except InvalidOperation:
-                num = num.quantize(Decimal("0.01"))
-
-            if integral:
-                formatted = f"{num:,.0f}"
-            else:
-                formatted = f"{num:,.2f}"
-
-            formatted = formatted.replace(",", "_").replace(".", ",").replace("_", ".")
-            return formatted
-
-        if fmt == "percent":
-            try:
-                num = float(value)
-            except (TypeError, ValueError):
-                return value
-            return f"{num:.2f}%"
-
-        if fmt == "percent_per_year":
-            try:
-                num = float(value)
-            except (TypeError, ValueError):
-                return value
-            return f"{num:.2f}%/năm"
-
-        if fmt == "integer":
-            try:
-                return int(value)
-            except (TypeError, ValueError):
-                return value
-
-        return value
+        formatter = _FORMATTERS.get(fmt)
+        return formatter(value) if formatter is not None else value
 
     def _resolve_extra_label(
         self, row_cfg: Dict[str, Any], values: Dict[str, Any]
@@ -141,9 +219,9 @@ class TemplateRenderer:
             if "field" in extra:
                 value = values.get(extra["field"])
                 return self._format_value(value, extra.get("format"))
-            return extra.get("text")
+            return _detached(extra.get("text"))
 
-        return extra
+        return _detached(extra)
 
     def _build_cell(
         self, cell_cfg: Dict[str, Any], values: Dict[str, Any]
@@ -157,7 +235,7 @@ class TemplateRenderer:
                 ),
             )
         else:
-            raw = cell_cfg.get("value")
+            raw = _detached(cell_cfg.get("value"))
             editable = cell_cfg.get("editable", False)
 
         formatted = self._format_value(raw, cell_cfg.get("format"))
@@ -173,11 +251,11 @@ class TemplateRenderer:
                 continue
             table = {
                 "id": table_cfg["id"],
-                "title": table_cfg.get("title", ""),
+                "title": _detached(table_cfg.get("title", "")),
                 "rows": [],
             }
 
-            col_defs = list(table_cfg.get("col_defs", []))
+            col_defs = [_detached(col_def) for col_def in table_cfg.get("col_defs", [])]
             if col_defs:
                 table["col_defs"] = col_defs
 
@@ -185,7 +263,7 @@ class TemplateRenderer:
                 table["rows"].append(self._build_row(row_cfg, values))
 
             if "note" in table_cfg:
-                table["note"] = table_cfg["note"]
+                table["note"] = _detached(table_cfg["note"])
 
             tables.append(table)
 
@@ -194,11 +272,11 @@ class TemplateRenderer:
     def _build_row(self, row_cfg: Dict[str, Any], values: Dict[str, Any]) -> Dict[str, Any]:
         row = {
             "id": row_cfg["id"],
-            "label": row_cfg.get("label", ""),
+            "label": _detached(row_cfg.get("label", "")),
         }
 
         if "type" in row_cfg:
-            row["type"] = row_cfg["type"]
+            row["type"] = _detached(row_cfg["type"])
 
         extra_label = self._resolve_extra_label(row_cfg, values)
         if extra_label is not None:
@@ -224,11 +302,11 @@ class TemplateRenderer:
             data[field_id] = {
                 "value": values.get(field_id),
                 "source": field.get("source", "user"),
-                "type": field.get("type"),
+                "type": _detached(field.get("type")),
                 "editable": field.get("editable", field.get("source") == "user"),
             }
             if "default" in field:
-                data[field_id]["default"] = field["default"]
+                data[field_id]["default"] = _detached(field["default"])
             if "formula" in field:
                 data[field_id]["formula"] = field["formula"]
         return data
@@ -267,17 +345,42 @@ def _collect_configs(config_args: Sequence[str]) -> Sequence[Path]:
     return sorted((BASE_DIR / "config").glob("template_scenario*.json"))
 
 
+_T = TypeVar("_T")
+
+# Below this many configs, worker start-up costs more than the rendering it
+# saves (and workers cannot reuse this process's config/formula caches).
+PARALLEL_MIN_CONFIGS = 16
+
+
+def _map_configs(
+    func: Callable[[Path], _T],
+    config_paths: Sequence[Path],
+    *,
+    parallel_threshold: int = PARALLEL_MIN_CONFIGS,
+) -> Iterator[_T]:
+    """Apply ``func`` to every config in order, using worker processes for big batches."""
+    if len(config_paths) < parallel_threshold:
+        yield from map(func, config_paths)
+        return
+    # Imported here: multiprocessing adds noticeable start-up time to small runs.
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(len(config_paths), os.cpu_count() or 1)) as executor:
+        yield from executor.map(func, config_paths)
+
+
 def render_config(
     config_path: Path,
     *,
     output_dir: Path,
     overrides: Optional[Dict[str, Any]] = None,
     table_ids: Optional[Iterable[str]] = None,
+    fast_json: bool = False,
 ) -> Path:
     renderer = TemplateRenderer(config_path, overrides=overrides, table_ids=table_ids)
     output_dir.mkdir(parents=True, exist_ok=True)
     output_path = output_dir / f"{config_path.stem}_payload.json"
-    renderer.write_payload(output_path)
+    renderer.write_payload(output_path, fast=fast_json)
     return output_path
 
 
@@ -308,6 +411,17 @@ def main() -> None:
         default=None,
         help="Override field values using key=value (can be repeated).",
     )
+    parser.add_argument(
+        "--fast-json",
+        action="store_true",
+        help="Encode payloads with orjson when installed (faster; floats may be spelled differently).",
+    )
+    parser.add_argument(
+        "--parallel-threshold",
+        type=int,
+        default=PARALLEL_MIN_CONFIGS,
+        help=f"Render in worker processes from this many configs on (default: {PARALLEL_MIN_CONFIGS}).",
+    )
 
     args = parser.parse_args()
 
@@ -323,13 +437,15 @@ def main() -> None:
         return
 
     output_dir = Path(args.output_dir).expanduser().resolve()
-    for config_path in configs:
-        output_path = render_config(
-            config_path,
-            output_dir=output_dir,
-            overrides=override_map if override_map else None,
-            table_ids=args.table_ids,
-        )
+    render_one = partial(
+        render_config,
+        output_dir=output_dir,
+        overrides=override_map if override_map else None,
+        table_ids=args.table_ids,
+        fast_json=args.fast_json,
+    )
+    results = _map_configs(render_one, configs, parallel_threshold=args.parallel_threshold)
+    for config_path, output_path in zip(configs, results):
         try:
             display_path = output_path.relative_to(output_dir)
         except ValueError:
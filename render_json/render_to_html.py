@@ -1,14 +1,34 @@
 import argparse
 import html
 import json
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from render import TemplateRenderer, _parse_overrides
+from render import PARALLEL_MIN_CONFIGS, TemplateRenderer, _SafeStr, _map_configs, _parse_overrides
+
+try:
+    import orjson
+
+    def _dumps(value: Any) -> str:
+        # orjson matches json.dumps only for these scalars; floats (1e-05, NaN)
+        # and containers (", " separators) keep the stdlib spelling.
+        if isinstance(value, (str, int)) or value is None:
+            try:
+                return orjson.dumps(value).decode()
+            except orjson.JSONEncodeError:  # e.g. integers beyond 64 bits
+                pass
+        return json.dumps(value, ensure_ascii=False)
+
+except ImportError:  # optional speedup; stdlib json is fine
+
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False)
 
 
 DEFAULT_OUTPUT = Path("render_json_demo.html")
 BASE_DIR = Path(__file__).resolve().parent
+_EMPTY_CELL: Dict[str, Any] = {}  # shared stand-in for missing cells; never mutate
 
 
 def _ensure_sequence(value: Optional[Iterable[str]]) -> Optional[Sequence[str]]:
@@ -19,6 +39,15 @@ def _ensure_sequence(value: Optional[Iterable[str]]) -> Optional[Sequence[str]]:
     return list(value)
 
 
+def _escape_value(value: Any) -> str:
+    # Formatter output and plain numbers contain nothing HTML-special.
+    if isinstance(value, _SafeStr):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    return html.escape(str(value))
+
+
 def _load_payload(
     config_path: Path,
     overrides: Optional[Dict[str, Any]] = None,
@@ -32,33 +61,34 @@ def _load_payload(
     return renderer.build_payload()
 
 
-def _render_inputs(inputs: Dict[str, Any]) -> str:
+def _render_inputs(inputs: Dict[str, Any], out: List[str]) -> None:
     if not inputs:
-        return ""
-
-    rows = []
-    for key, value in inputs.items():
-        rows.append(
-            f"<tr><th>{html.escape(str(key))}</th><td>{html.escape(str(value))}</td></tr>"
-        )
+        return
 
-    return (
+    out.append(
         "<section class='inputs'>"
         "<h2>Thông số đầu vào</h2>"
         "<table class='simple-table'>"
         "<tbody>"
-        f"{''.join(rows)}"
-        "</tbody>"
-        "</table>"
-        "</section>"
     )
+    for key, value in inputs.items():
+        out.append(
+            f"<tr><th>{html.escape(str(key))}</th><td>{html.escape(str(value))}</td></tr>"
+        )
+    out.append("</tbody></table></section>")
 
 
-def _render_data_snapshot(data: Dict[str, Dict[str, Any]]) -> str:
+def _render_data_snapshot(data: Dict[str, Dict[str, Any]], out: List[str]) -> None:
     if not data:
-        return ""
+        return
 
-    rows = []
+    out.append(
+        "<details class='data-dump'>"
+        "<summary>Dữ liệu thô</summary>"
+        "<table class='data-table'>"
+        "<thead><tr><th>Field</th><th>Value</th><th>Meta</th></tr></thead>"
+        "<tbody>"
+    )
     for field_id, meta in data.items():
         value = meta.get("value")
         source = meta.get("source", "user")
@@ -74,55 +104,40 @@ def _render_data_snapshot(data: Dict[str, Dict[str, Any]]) -> str:
             attrs.append(f"default: {meta['default']}")
         meta_text = ", ".join(attrs)
 
-        rows.append(
+        out.append(
             "<tr>"
             f"<th>{html.escape(field_id)}</th>"
-            f"<td>{html.escape(json.dumps(value, ensure_ascii=False))}</td>"
+            f"<td>{html.escape(_dumps(value))}</td>"
             f"<td>{html.escape(meta_text)}</td>"
             "</tr>"
         )
-
-    return (
-        "<details class='data-dump'>"
-        "<summary>Dữ liệu thô</summary>"
-        "<table class='data-table'>"
-        "<thead><tr><th>Field</th><th>Value</th><th>Meta</th></tr></thead>"
-        "<tbody>"
-        f"{''.join(rows)}"
-        "</tbody>"
-        "</table>"
-        "</details>"
-    )
+    out.append("</tbody></table></details>")
 
 
-def _render_table(table: Dict[str, Any]) -> str:
+def _render_table(table: Dict[str, Any], out: List[str]) -> None:
     col_defs = table.get("col_defs")
-    has_multiple_cols = bool(col_defs)
-    headers_html = _render_table_headers(col_defs)
-    body_rows = "".join(
-        _render_row(row, col_defs, depth=0) for row in table.get("rows", [])
-    )
-    note_html = ""
-    if table.get("note"):
-        note_html = f"<div class='table-note'>{html.escape(table['note'])}</div>"
-
-    return (
+    out.append(
         "<section class='table-block'>"
         f"<h2>{html.escape(table.get('title', ''))}</h2>"
         "<table class='data-table'>"
-        f"{headers_html}"
-        f"<tbody>{body_rows}</tbody>"
-        "</table>"
-        f"{note_html}"
-        "</section>"
     )
+    _render_table_headers(col_defs, out)
+    col_keys = tuple(col.get("key", "") for col in col_defs) if col_defs else ("main",)
+    out.append("<tbody>")
+    for row in table.get("rows", []):
+        _render_row(row, col_keys, out, depth=0)
+    out.append("</tbody></table>")
+    if table.get("note"):
+        out.append(f"<div class='table-note'>{html.escape(table['note'])}</div>")
+    out.append("</section>")
 
 
-def _render_table_headers(col_defs: Optional[Sequence[Dict[str, Any]]]) -> str:
+def _render_table_headers(col_defs: Optional[Sequence[Dict[str, Any]]], out: List[str]) -> None:
     if not col_defs:
-        return "<thead><tr><th class='col-label'>Hạng mục</th><th>Giá trị</th></tr></thead>"
+        out.append("<thead><tr><th class='col-label'>Hạng mục</th><th>Giá trị</th></tr></thead>")
+        return
 
-    header_cells = ["<th class='col-label'>Hạng mục</th>"]
+    out.append("<thead><tr><th class='col-label'>Hạng mục</th>")
     for col in col_defs:
         title = html.escape(col.get("title", ""))
         subtitle = col.get("subtitle")
@@ -130,17 +145,17 @@ def _render_table_headers(col_defs: Optional[Sequence[Dict[str, Any]]]) -> str:
             subtitle_html = f"<div class='subtitle'>{html.escape(subtitle)}</div>"
         else:
             subtitle_html = ""
-        header_cells.append(f"<th><div>{title}{subtitle_html}</div></th>")
-
-    return f"<thead><tr>{''.join(header_cells)}</tr></thead>"
+        out.append(f"<th><div>{title}{subtitle_html}</div></th>")
+    out.append("</tr></thead>")
 
 
 def _render_row(
     row: Dict[str, Any],
-    col_defs: Optional[Sequence[Dict[str, Any]]],
+    col_keys: Tuple[str, ...],
+    out: List[str],
     *,
     depth: int,
-) -> str:
+) -> None:
     row_type = row.get("type")
     classes = ["row"]
     if row_type == "label":
@@ -152,69 +167,60 @@ def _render_row(
     label_parts = [html.escape(row.get("label", ""))]
     if row.get("extra_label") is not None:
         label_parts.append(
-            f"<span class='extra-label'>{html.escape(str(row['extra_label']))}</span>"
+            f"<span class='extra-label'>{_escape_value(row['extra_label'])}</span>"
         )
     label_html = " ".join(label_parts)
 
-    cells_html = []
-    if col_defs:
-        for col in col_defs:
-            cell_cfg = row.get("cells", {}).get(col.get("key", ""), {})
-            cells_html.append(_render_cell(cell_cfg))
-    else:
-        cell_cfg = row.get("cells", {}).get("main", {})
-        cells_html.append(_render_cell(cell_cfg))
-
-    row_html = (
+    out.append(
         f"<tr class=\"{' '.join(classes)}\">"
         f"<th style='padding-left:{indent_px}px'>{label_html}</th>"
-        f"{''.join(cells_html)}"
-        "</tr>"
     )
+    cells = row.get("cells") or _EMPTY_CELL
+    for key in col_keys:
+        _render_cell(cells.get(key, _EMPTY_CELL), out)
+    out.append("</tr>")
 
-    children_html = ""
     for child in row.get("children", []):
-        children_html += _render_row(child, col_defs, depth=depth + 1)
+        _render_row(child, col_keys, out, depth=depth + 1)
 
-    return row_html + children_html
 
-
-def _render_cell(cell_cfg: Dict[str, Any]) -> str:
+def _render_cell(cell_cfg: Dict[str, Any], out: List[str]) -> None:
     value = cell_cfg.get("value")
     if value is None:
         display = ""
     else:
-        display = html.escape(str(value))
+        display = _escape_value(value)
 
     classes = ["value-cell"]
     if not cell_cfg.get("editable", False):
         classes.append("readonly")
-    return f"<td class=\"{' '.join(classes)}\">{display}</td>"
+    out.append(f"<td class=\"{' '.join(classes)}\">{display}</td>")
 
 
-def _render_notes(notes: Sequence[str]) -> str:
+def _render_notes(notes: Sequence[str], out: List[str]) -> None:
     if not notes:
-        return ""
+        return
 
-    items = "".join(f"<li>{html.escape(note)}</li>" for note in notes)
-    return f"<section class='notes'><h2>Ghi chú</h2><ul>{items}</ul></section>"
+    out.append("<section class='notes'><h2>Ghi chú</h2><ul>")
+    for note in notes:
+        out.append(f"<li>{html.escape(note)}</li>")
+    out.append("</ul></section>")
 
 
-def _render_payload(payload: Dict[str, Any]) -> str:
-    sections = [
+def _render_payload(payload: Dict[str, Any], out: List[str]) -> None:
+    out.append(
         f"<header><h1>{html.escape(payload.get('title', ''))}</h1>"
         f"<div class='currency'>Đơn vị: {html.escape(payload.get('currency', ''))}</div>"
         "</header>"
-    ]
+    )
 
-    sections.append(_render_inputs(payload.get("inputs", {})))
-    sections.append(_render_data_snapshot(payload.get("data", {})))
+    _render_inputs(payload.get("inputs", {}), out)
+    _render_data_snapshot(payload.get("data", {}), out)
 
     for table in payload.get("tables", []):
-        sections.append(_render_table(table))
+        _render_table(table, out)
 
-    sections.append(_render_notes(payload.get("notes", [])))
-    return "".join(filter(None, sections))
+    _render_notes(payload.get("notes", []), out)
 
 
 def _wrap_document(body: str) -> str:
@@ -331,13 +337,13 @@ def render_configs_to_html(
     *,
     overrides: Optional[Dict[str, Any]] = None,
     table_ids: Optional[Iterable[str]] = None,
+    parallel_threshold: int = PARALLEL_MIN_CONFIGS,
 ) -> str:
-    sections = []
-    for path in config_paths:
-        payload = _load_payload(path, overrides=overrides, table_ids=table_ids)
-        sections.append(_render_payload(payload))
-    body = "".join(sections)
-    return _wrap_document(body)
+    out: List[str] = []
+    load = partial(_load_payload, overrides=overrides, table_ids=_ensure_sequence(table_ids))
+    for payload in _map_configs(load, config_paths, parallel_threshold=parallel_threshold):
+        _render_payload(payload, out)
+    return _wrap_document("".join(out))
 
 
 def _parse_args() -> argparse.Namespace:
@@ -369,6 +375,12 @@ def _parse_args() -> argparse.Namespace:
         action="append",
         help="Render only the specified table id (may be used multiple times).",
     )
+    parser.add_argument(
+        "--parallel-threshold",
+        type=int,
+        default=PARALLEL_MIN_CONFIGS,
+        help=f"Build payloads in worker processes from this many configs on (default: {PARALLEL_MIN_CONFIGS}).",
+    )
     return parser.parse_args()
 
 
@@ -383,7 +395,10 @@ def main() -> None:
     overrides = _parse_overrides(args.override) if args.override else None
 
     html_output = render_configs_to_html(
-        config_paths, overrides=overrides, table_ids=args.table_ids
+        config_paths,
+        overrides=overrides,
+        table_ids=args.table_ids,
+        parallel_threshold=args.parallel_threshold,
     )
     args.output.write_text(html_output, encoding="utf8")
     print(f"✅ Rendered HTML → {args.output.resolve()}")
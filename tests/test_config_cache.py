@@ -0,0 +1,71 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+render_json = _load("render_json_render", ROOT / "render_json" / "render.py")
+
+CONFIG = {
+    "title": "Cache",
+    "notes": ["n1"],
+    "fields": [{"id": "a", "source": "user", "default": [1, 2]}],
+    "layout": {
+        "tables": [
+            {
+                "id": "t",
+                "col_defs": [{"key": "main", "title": "Value"}],
+                "note": ["table note"],
+                "rows": [
+                    {
+                        "id": "r",
+                        "label": "Row",
+                        "extra_label": ["extra"],
+                        "cells": {"main": {"value": {"literal": 1}}},
+                    }
+                ],
+            }
+        ]
+    },
+}
+
+
+class ConfigCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "config.json"
+        self.path.write_text(json.dumps(CONFIG), encoding="utf8")
+
+    def _payload(self):
+        return render_json.TemplateRenderer(self.path).build_payload()
+
+    def test_mutating_a_payload_does_not_change_later_renders(self) -> None:
+        expected = json.loads(json.dumps(self._payload()))
+
+        payload = self._payload()
+        payload["notes"].append("MUT")
+        payload["data"]["a"]["value"].append("MUT")
+        payload["data"]["a"]["default"].append("MUT")
+        table = payload["tables"][0]
+        table["col_defs"][0]["title"] = "MUT"
+        table["note"].append("MUT")
+        row = table["rows"][0]
+        row["extra_label"].append("MUT")
+        row["cells"]["main"]["value"]["literal"] = "MUT"
+
+        self.assertEqual(self._payload(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Both tools ship a top-level ``render`` module, so load them under distinct names.
+render_json = _load("render_json_render", ROOT / "render_json" / "render.py")
+render_html = _load("render_html_render", ROOT / "render_html" / "render.py")
+
+BAD_FORMULAS = [
+    {"id": "a", "source": "user", "default": 1},
+    {"id": "x", "source": "calc", "formula": "nope + 1"},
+    {"id": "y", "source": "calc", "formula": "1 +"},
+]
+
+
+class FormulaErrorTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _write(self, name: str, data) -> Path:
+        path = self.tmp / name
+        path.write_text(json.dumps(data), encoding="utf8")
+        return path
+
+    def _json_values(self, fields, name: str = "config.json", **config):
+        path = self._write(name, {"fields": fields, "layout": {}, **config})
+        payload = render_json.TemplateRenderer(path).build_payload()
+        return {key: meta["value"] for key, meta in payload["data"].items()}
+
+    def test_json_runtime_and_syntax_errors_evaluate_to_none(self) -> None:
+        self.assertEqual(self._json_values(BAD_FORMULAS), {"a": 1, "x": None, "y": None})
+
+    def test_json_lambda_backend_syntax_error_evaluates_to_none(self) -> None:
+        values = self._json_values(BAD_FORMULAS, eval_backend="lambda")
+        self.assertEqual(values, {"a": 1, "x": None, "y": None})
+
+    def test_json_errors_do_not_leak_between_renders(self) -> None:
+        self._json_values(BAD_FORMULAS[:2], "runtime.json")
+        values = self._json_values([BAD_FORMULAS[0], BAD_FORMULAS[2]], "syntax.json")
+        self.assertEqual(values, {"a": 1, "y": None})
+
+    def test_json_multi_statement_formula_runs_after_its_dependencies(self) -> None:
+        values = self._json_values(
+            [
+                {"id": "a", "source": "user", "default": 10},
+                {"id": "c", "source": "calc", "formula": "t = b * 2\nt + 1"},
+                {"id": "b", "source": "calc", "formula": "a + 1"},
+            ]
+        )
+        self.assertEqual(values["c"], 23)
+
+    def test_json_duplicate_calc_id_keeps_last_formula(self) -> None:
+        values = self._json_values(
+            [
+                {"id": "a", "source": "user", "default": 1},
+                {"id": "x", "source": "calc", "formula": "a + 1"},
+                {"id": "x", "source": "calc", "formula": "a + 100"},
+            ]
+        )
+        self.assertEqual(values["x"], 101)
+
+    def test_html_runtime_and_syntax_errors_evaluate_to_none(self) -> None:
+        globals_path = self._write("globals.json", {"fields": []})
+        scenario_path = self._write("scenario.json", {"fields": BAD_FORMULAS})
+        data = render_html.prepare_scenario_data(globals_path, scenario_path)
+        self.assertEqual([field.value for field in data.fields], [1, None, None])
+
+    def test_html_lambda_backend_syntax_error_evaluates_to_none(self) -> None:
+        globals_path = self._write("globals.json", {"fields": []})
+        scenario_path = self._write(
+            "scenario.json", {"fields": BAD_FORMULAS, "eval_backend": "lambda"}
+        )
+        data = render_html.prepare_scenario_data(globals_path, scenario_path)
+        self.assertEqual([field.value for field in data.fields], [1, None, None])
+
+    def test_html_specialized_compute_matches_generic_path(self) -> None:
+        fields = [
+            {"id": "a", "source": "user", "default": 3},
+            {"id": "b", "source": "user", "default": 7},
+            {"id": "d", "source": "calc", "formula": "c + a"},
+            {"id": "c", "source": "calc", "formula": "max(a, b) * 2"},
+        ]
+        globals_path = self._write("globals.json", {"fields": []})
+        generic_path = self._write("generic.json", {"fields": fields})
+        lambda_path = self._write("lambda.json", {"fields": fields, "eval_backend": "lambda"})
+        for inputs, expected in (({}, 17), ({"a": 10}, 30), ({"max": min}, 9)):
+            with self.subTest(inputs=inputs):
+                generic = render_html.prepare_scenario_data(globals_path, generic_path, inputs=inputs)
+                native = render_html.prepare_scenario_data(globals_path, lambda_path, inputs=inputs)
+                self.assertEqual(native.values["d"], expected)
+                self.assertEqual(native.values, generic.values)
+        key = render_html._schema_key(fields)
+        self.assertIsNotNone(render_html._SPECIALIZED.get(key))
+
+    def test_html_field_view_supports_slices(self) -> None:
+        globals_path = self._write("globals.json", {"fields": []})
+        scenario_path = self._write("scenario.json", {"fields": BAD_FORMULAS})
+        data = render_html.prepare_scenario_data(globals_path, scenario_path)
+        self.assertEqual([field.id for field in data.fields[1:]], ["x", "y"])
+        self.assertEqual([field.id for field in data.fields[::-1]], ["y", "x", "a"])
+        self.assertEqual([field.value for field in data.fields[:-1]], [1, None])
+
+    def test_html_scenario_data_compares_and_prints_by_field_values(self) -> None:
+        globals_path = self._write("globals.json", {"fields": []})
+        scenario_path = self._write("scenario.json", {"fields": BAD_FORMULAS})
+        first = render_html.prepare_scenario_data(globals_path, scenario_path)
+        second = render_html.prepare_scenario_data(globals_path, scenario_path)
+        self.assertEqual(first, second)
+        self.assertEqual(first.fields, second.fields.materialize())
+        self.assertIn("FieldOutput(id='x'", repr(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
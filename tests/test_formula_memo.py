@@ -0,0 +1,61 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+render_json = _load("render_json_render", ROOT / "render_json" / "render.py")
+
+
+class FormulaMemoTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _render(self, fields, **overrides):
+        path = self.tmp / "config.json"
+        if not path.exists():
+            path.write_text(json.dumps({"fields": fields, "layout": {}}), encoding="utf8")
+        payload = render_json.TemplateRenderer(path, overrides=overrides).build_payload()
+        return {key: meta["value"] for key, meta in payload["data"].items()}
+
+    def test_names_set_by_another_formula_are_not_memoized_stale(self) -> None:
+        fields = [
+            {"id": "a", "source": "user", "default": 1},
+            {"id": "x", "source": "calc", "formula": "tmp = a * 2\ntmp"},
+            {"id": "y", "source": "calc", "formula": "tmp + 1"},
+        ]
+        self.assertEqual(self._render(fields, a=1)["y"], 3)
+        self.assertEqual(self._render(fields, a=5)["y"], 11)
+
+    def test_memoized_inputs_track_overrides(self) -> None:
+        fields = [
+            {"id": "a", "source": "user", "default": 1},
+            {"id": "x", "source": "calc", "formula": "max(a, 2) * 10"},
+        ]
+        self.assertEqual(self._render(fields, a=1)["x"], 20)
+        self.assertEqual(self._render(fields, a=5)["x"], 50)
+        self.assertEqual(self._render(fields, a=1)["x"], 20)
+
+    def test_builds_do_not_share_list_results(self) -> None:
+        fields = [
+            {"id": "a", "source": "user", "default": 1},
+            {"id": "pair", "source": "calc", "formula": "[a, a]"},
+        ]
+        self._render(fields)["pair"].append("mutated")
+        self.assertEqual(self._render(fields)["pair"], [1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _load(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+render_json = _load("render_json_render", ROOT / "render_json" / "render.py")
+
+
+class PayloadJsonTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _write(self, name: str, data) -> Path:
+        path = self.tmp / name
+        path.write_text(json.dumps(data), encoding="utf8")
+        return path
+
+    def _render(self, config_path: Path, **kwargs) -> Path:
+        return render_json.render_config(config_path, output_dir=self.tmp / "out", **kwargs)
+
+    def test_fast_json_writes_the_same_data(self) -> None:
+        config = self._write(
+            "config.json",
+            {
+                "fields": [
+                    {"id": "a", "source": "user", "default": 2.5},
+                    {"id": "b", "source": "calc", "formula": "a * 4"},
+                ],
+                "layout": {},
+            },
+        )
+        reference = json.loads(self._render(config).read_text(encoding="utf8"))
+        fast = json.loads(self._render(config, fast_json=True).read_text(encoding="utf8"))
+        self.assertEqual(fast, reference)
+
+    @unittest.skipIf(render_json.orjson is None, "orjson is not installed")
+    def test_fast_json_falls_back_when_orjson_cannot_encode(self) -> None:
+        # orjson rejects integers wider than 64 bits; the stdlib encoder does not.
+        config = self._write(
+            "config.json",
+            {"fields": [{"id": "big", "source": "user", "default": 0}], "layout": {}},
+        )
+        overrides = {"big": 2**70}
+        reference = self._render(config, overrides=overrides).read_bytes()
+        fast = self._render(config, overrides=overrides, fast_json=True).read_bytes()
+        self.assertEqual(fast, reference)
+        self.assertIn(str(2**70).encode(), fast)
+
+    def test_config_with_nan_parses_like_the_stdlib(self) -> None:
+        config = self.tmp / "config.json"
+        config.write_text(
+            '{"fields": [{"id": "a", "source": "user", "default": NaN}], "layout": {}}',
+            encoding="utf8",
+        )
+        payload = render_json.TemplateRenderer(config).build_payload()
+        value = payload["data"]["a"]["value"]
+        self.assertNotEqual(value, value)
+
+
+if __name__ == "__main__":
+    unittest.main()